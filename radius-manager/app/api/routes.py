@@ -3,16 +3,24 @@ from flask import jsonify, request
 from app import db
 from app.api import bp
 from app.models import Switch
+from app.sites import fan_out
 
 @bp.route('/switches', methods=['GET'])
 def get_switches():
-    switches = Switch.query.all()
+    # Query every site in parallel and merge
+    results, errors = fan_out(lambda site, session: session.query(Switch).order_by(Switch.id).all())
     data = []
-    for s in switches:
-        data.append({
-            'id': s.id,
-            'name': s.name,
-            'ip_address': s.ip_address,
-            'description': s.description
-        })
-    return jsonify(data)
+    for site, rows in results:
+        for s in rows:
+            data.append({
+                'id': s.id,
+                'site': site,
+                'name': s.name,
+                'ip_address': s.ip_address,
+                'description': s.description
+            })
+    response = jsonify(data)
+    # Unreachable sites are named in a header so the body keeps its list shape for existing clients
+    if errors:
+        response.headers['X-Unavailable-Sites'] = ','.join(sorted(errors))
+    return response
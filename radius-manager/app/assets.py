@@ -0,0 +1,187 @@
+# Static asset pipeline: fingerprinted, pre-compressed copies served with immutable cache headers
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import time
+
+import click
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is always produced
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+RETIRED_NAME = 'retired.json'
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.xml', '.ico', '.txt', '.html'}
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def _write_json(path, data):
+    """Replace a JSON file atomically so running workers never read half of it."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build(static_folder):
+    """Copy every static file into dist/ under a content-hashed name and pre-compress text assets.
+
+    Files from earlier builds are left in place, because running workers and
+    cached pages may still link to them. Ones no longer in the manifest are
+    recorded in retired.json for prune() to delete later. Returns the new manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            rel = os.path.relpath(src, static_folder).replace(os.sep, '/')
+            with open(src, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem, ext = os.path.splitext(rel)
+            hashed = f'{DIST_DIR}/{stem}.{digest}{ext}'
+            manifest[rel] = hashed
+            dest = os.path.join(static_folder, hashed)
+            if os.path.exists(dest):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, 'wb') as f:
+                f.write(data)
+            if ext.lower() in COMPRESSIBLE:
+                # mtime=0 keeps the .gz output reproducible between builds
+                with open(dest + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(dest + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+    previous = _read_json(os.path.join(dist, MANIFEST_NAME))
+    retired = _read_json(os.path.join(dist, RETIRED_NAME))
+    current = set(manifest.values())
+    now = time.time()
+    for hashed in previous.values():
+        if hashed not in current:
+            retired.setdefault(hashed, now)
+    retired = {hashed: since for hashed, since in retired.items() if hashed not in current}
+    _write_json(os.path.join(dist, RETIRED_NAME), retired)
+    # Written last: workers pick the new names up only once every file exists
+    _write_json(os.path.join(dist, MANIFEST_NAME), manifest)
+    return manifest
+
+
+def prune(static_folder, max_age):
+    """Delete files retired more than max_age seconds ago. Returns how many assets were removed."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    retired = _read_json(os.path.join(dist, RETIRED_NAME))
+    cutoff = time.time() - max_age
+    removed = 0
+    for hashed, since in list(retired.items()):
+        if since > cutoff:
+            continue
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(os.path.join(static_folder, hashed + suffix))
+            except FileNotFoundError:
+                pass
+        del retired[hashed]
+        removed += 1
+    _write_json(os.path.join(dist, RETIRED_NAME), retired)
+    return removed
+
+
+class Manifest:
+    """The current build's manifest, re-read whenever manifest.json changes on disk."""
+
+    def __init__(self, static_folder):
+        self.path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        self.entries = {}
+        self.digest = ''
+        self._mtime = None
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            self.entries, self.digest = {}, ''
+            return
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        self.entries = json.loads(raw)
+        self.digest = hashlib.sha1(raw).hexdigest()
+
+
+def init_app(app):
+    manifest = app.extensions['assets'] = Manifest(app.static_folder)
+
+    @app.before_request
+    def refresh_manifest():
+        # One stat per request; picks up `flask build-static` without a restart
+        manifest.refresh()
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.entries.get(values['filename'], values['filename'])
+
+    def serve_static(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return app.send_static_file(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[candidate] and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+        response = send_from_directory(app.static_folder, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+
+    @app.cli.command('build-static')
+    def build_static():
+        """Fingerprint and pre-compress everything under app/static."""
+        built = build(app.static_folder)
+        print(f"Built {len(built)} assets into {os.path.join(app.static_folder, DIST_DIR)}")
+
+    @app.cli.command('prune-static')
+    @click.option('--max-age', default=7 * 24, show_default=True, help='Hours a superseded asset is kept.')
+    def prune_static(max_age):
+        """Delete fingerprinted assets superseded by a build more than --max-age hours ago."""
+        removed = prune(app.static_folder, max_age * 3600)
+        print(f"Removed {removed} retired assets")
+
+
+def manifest_digest(app):
+    """Digest of the manifest currently served, for mixing into page ETags."""
+    manifest = app.extensions.get('assets')
+    return manifest.digest if manifest else ''
@@ -5,6 +5,7 @@ from app import db
 from app.auth import bp
 from app.models import User
 from app.auth.forms import LoginForm, RegistrationForm
+from app.ratelimit import login_ip_limiter, login_limiter, register_limiter
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -12,10 +13,22 @@ def login():
         return redirect(url_for('main.index'))
     form = LoginForm()
     if form.validate_on_submit():
+        # Reserve the attempt before touching the database or the password hash. The
+        # username is counted per client address, so failures sent from elsewhere
+        # cannot lock its owner out
+        ip = request.remote_addr
+        user_key = f'user:{ip}:{form.username.data.lower()}'
+        if not (login_ip_limiter.acquire(f'ip:{ip}') and login_limiter.acquire(user_key)):
+            flash('Too many login attempts. Please try again later.')
+            return render_template('auth/login.html', title='Sign In', form=form), 429
         user = User.query.filter_by(username=form.username.data).first()
         if user is None or not user.check_password(form.password.data):
             flash('Invalid username or password')
             return redirect(url_for('auth.login'))
+        login_limiter.reset(user_key)
+        if user.needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or not next_page.startswith('/'):
@@ -33,6 +46,11 @@ def register():
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
     form = RegistrationForm()
+    if request.method == 'POST':
+        # Checked before validation, which queries the database for duplicates
+        if not register_limiter.acquire(f'ip:{request.remote_addr}'):
+            flash('Too many registration attempts. Please try again later.')
+            return render_template('auth/register.html', title='Register', form=form), 429
     if form.validate_on_submit():
         user = User(username=form.username.data, email=form.email.data)
         user.set_password(form.password.data)
@@ -0,0 +1,59 @@
+# Conditional GET support: ETag/Last-Modified derived from the rows a page displays
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from sqlalchemy import func
+
+from app import db
+from app.assets import manifest_digest
+from app.sites import current_site
+
+
+def _freshness(dbsession, sources):
+    return [
+        (model.__tablename__, *dbsession.query(func.count(model.id), func.max(model.updated_at)).filter(*criteria).one())
+        for model, *criteria in sources
+    ]
+
+
+def page_validators(sources):
+    """Return (etag, last_modified) for a list of (Model, *criteria) row sources.
+
+    Row counts go into the ETag so deletions, which never raise max(updated_at),
+    still change it.
+    """
+    site = current_site()
+    # Pending flash messages are part of the rendered page, so they must change the ETag;
+    # so must a static rebuild, or cached HTML would keep linking to old fingerprinted assets
+    parts = [str(current_user.get_id()), repr(session.get('_flashes')), manifest_digest(current_app)]
+    last_modified = None
+    for table, count, latest in _freshness(db.session, sources):
+        parts.append(f'{site}:{table}:{count}:{latest.isoformat() if latest else ""}')
+        if latest and (last_modified is None or latest > last_modified):
+            last_modified = latest
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return etag, last_modified
+
+
+def render_if_modified(sources, render):
+    """Answer 304 when the client's copy is current, otherwise call render() and attach validators.
+
+    Only If-None-Match is honoured: a bare If-Modified-Since cannot see
+    deletions, which leave max(updated_at) unchanged. Last-Modified is still
+    sent for display and logging.
+    """
+    etag, last_modified = page_validators(sources)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
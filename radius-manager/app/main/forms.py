@@ -12,6 +12,7 @@ class RegistrationForm(FlaskForm):
     submit = SubmitField('Register')
 
 class SwitchForm(FlaskForm):
+    site = SelectField('Site', validators=[DataRequired()])
     name = StringField('Switch Name', validators=[DataRequired()])
     ip_address = StringField('IP Address', validators=[DataRequired(), IPAddress()])
     secret = StringField('Secret', validators=[DataRequired()])
@@ -1,11 +1,14 @@
 
 # Routes for managing switches, VLANs, and MAC address mappings
 import time
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from app import db
 from app.main import bp
 from app.models import User, Switch, Vlan, MacVlanMapping, RadCheck, RadReply, NasClient
+from app.nas import nas_registry
+from app.conditional import render_if_modified
+from app.sites import DEFAULT_SITE, current_site, set_current_site, site_names, fan_out
 from app.main.forms import SwitchForm, VlanForm, MacAddressForm, RegistrationForm
 import re
 #from pysnmp.hlapi.asyncio import getCmd
@@ -25,6 +28,33 @@ from pysnmp.hlapi import SnmpEngine, nextCmd, CommunityData, UdpTransportTarget,
 #from app.models import User
 #from app.main.forms import RegistrationForm
 
+# Endpoints that address a switch, VLAN or MAC row by id within one site
+SITE_ENDPOINTS = {
+    'main.edit_switch', 'main.delete_switch', 'main.switch_vlans', 'main.add_vlan', 'main.edit_vlan',
+    'main.delete_vlan', 'main.switch_macs', 'main.add_mac', 'main.edit_mac', 'main.delete_mac',
+}
+
+@bp.before_request
+def select_site():
+    try:
+        set_current_site(request.args.get('site', DEFAULT_SITE))
+    except KeyError:
+        abort(404)
+
+@bp.url_defaults
+def add_site(endpoint, values):
+    if endpoint in SITE_ENDPOINTS and 'site' not in values and current_site() != DEFAULT_SITE:
+        values['site'] = current_site()
+
+def all_switches():
+    """(site, switch) pairs from every reachable site, merged by site then id, plus {site: error} for the rest.
+
+    The site is the database a row was read from, not Switch.site, which
+    sql/002 back-fills with 'default' on every existing database.
+    """
+    results, errors = fan_out(lambda site, session: session.query(Switch).order_by(Switch.id).all())
+    return [(site, switch) for site, rows in results for switch in rows], errors
+
 @bp.route('/users/add', methods=['GET', 'POST'])
 @login_required
 def add_user():
@@ -51,15 +81,14 @@ def add_user():
 @bp.route('/index')
 @login_required
 def index():
-    switches = Switch.query.all()
-    return render_template('main/index.html', title='Home', switches=switches)
+    return render_template('main/index.html', title='Home')
 
 @bp.route('/switches')
 @login_required
 def switches():
-    switches = Switch.query.all()
+    switches, site_errors = all_switches()
     
-    for switch in switches:
+    for site, switch in switches:
         print(switch.ip_address);#time.sleep(300)
         #switch.is_online = is_switch_online_snmp(switch.ip_address)
         if 1==1: #try:
@@ -67,30 +96,27 @@ def switches():
             print("switch.is_online: ", switch.is_online)
         else: #except:
             pass
-    return render_template('main/switches.html', title='Switches', switches=switches)
+    return render_template('main/switches.html', title='Switches', switches=switches, site_errors=site_errors)
 
 
 @bp.route('/switch/add', methods=['GET', 'POST'])
 @login_required
 def add_switch():
     form = SwitchForm()
+    form.site.choices = [(s, s) for s in site_names()]
     if form.validate_on_submit():
+        # Everything below is written to the chosen site's database
+        set_current_site(form.site.data)
         switch = Switch(
+            site=form.site.data,
             name=form.name.data,
             ip_address=form.ip_address.data,
             secret=form.secret.data,
             description=form.description.data
         )
-        # Also add to the NAS table for FreeRADIUS
-        nas = NasClient(
-            nasname=form.ip_address.data,
-            shortname=form.name.data,
-            type='cisco',
-            secret=form.secret.data,
-            description=form.description.data
-        )
         db.session.add(switch)
-        db.session.add(nas)
+        # Also add to the NAS table for FreeRADIUS
+        nas_registry.sync(switch)
         db.session.commit()
         flash(f'Switch {form.name.data} has been added.')
         return redirect(url_for('main.switches'))
@@ -101,18 +127,15 @@ def add_switch():
 def edit_switch(id):
     switch = Switch.query.get_or_404(id)
     form = SwitchForm(obj=switch)
+    # Moving a switch between sites is not supported
+    del form.site
     if form.validate_on_submit():
         switch.name = form.name.data
         switch.ip_address = form.ip_address.data
         switch.secret = form.secret.data
         switch.description = form.description.data
         # Update NAS entry
-        nas = NasClient.query.filter_by(nasname=switch.ip_address).first()
-        if nas:
-            nas.nasname = form.ip_address.data
-            nas.shortname = form.name.data
-            nas.secret = form.secret.data
-            nas.description = form.description.data
+        nas_registry.sync(switch)
         db.session.commit()
         flash(f'Switch {switch.name} has been updated.')
         return redirect(url_for('main.switches'))
@@ -122,9 +145,7 @@ def edit_switch(id):
 @login_required
 def delete_switch(id):
     switch = Switch.query.get_or_404(id)
-    nas = NasClient.query.filter_by(nasname=switch.ip_address).first()
-    if nas:
-        db.session.delete(nas)
+    nas_registry.remove(switch)
     db.session.delete(switch)
     db.session.commit()
     flash(f'Switch {switch.name} has been deleted.')
@@ -134,8 +155,10 @@ def delete_switch(id):
 @login_required
 def switch_vlans(id):
     switch = Switch.query.get_or_404(id)
-    vlans = Vlan.query.filter_by(switch_id=id).all()
-    return render_template('main/vlans.html', title=f'VLANs for {switch.name}', switch=switch, vlans=vlans)
+    return render_if_modified(
+        [(Switch, Switch.id == id), (Vlan, Vlan.switch_id == id)],
+        lambda: render_template('main/vlans.html', title=f'VLANs for {switch.name}', switch=switch,
+                                vlans=Vlan.query.filter_by(switch_id=id).all()))
 
 @bp.route('/switch/<int:id>/vlan/add', methods=['GET', 'POST'])
 @login_required
@@ -183,8 +206,10 @@ def delete_vlan(id):
 @login_required
 def switch_macs(id):
     switch = Switch.query.get_or_404(id)
-    mac_mappings = MacVlanMapping.query.filter_by(switch_id=id).all()
-    return render_template('main/macs.html', title=f'MAC Addresses for {switch.name}', switch=switch, mac_mappings=mac_mappings)
+    return render_if_modified(
+        [(Switch, Switch.id == id), (MacVlanMapping, MacVlanMapping.switch_id == id)],
+        lambda: render_template('main/macs.html', title=f'MAC Addresses for {switch.name}', switch=switch,
+                                mac_mappings=MacVlanMapping.query.filter_by(switch_id=id).all()))
 
 @bp.route('/switch/<int:id>/mac/add', methods=['GET', 'POST'])
 @login_required
@@ -1,9 +1,23 @@
 # SQLAlchemy models: User, Switch, Vlan, MacVlanMapping, plus FreeRADIUS tables
+# Models marked __site_scoped__ live in the database of the current site (see app.sites)
 from app import db, login_manager
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 from datetime import datetime
 
+def normalise_hash_method(method):
+    """Expand shorthand such as 'pbkdf2' to the full prefix werkzeug writes into the hash."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt' and not args:
+        # werkzeug's scrypt defaults: n=2**15, r=8, p=1
+        return 'scrypt:32768:8:1'
+    return method
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -13,20 +27,26 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def needs_rehash(self):
+        """True when the stored hash was made with a different method/cost than configured."""
+        return not self.password_hash.startswith(current_app.config['PASSWORD_HASH_METHOD'] + '$')
+
 @login_manager.user_loader
 def load_user(id):
     return User.query.get(int(id))
 
 class Switch(db.Model):
     __tablename__ = 'switches'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     ip_address = db.Column(db.String(15), unique=True, nullable=False)
+    site = db.Column(db.String(32), nullable=False, default='default', index=True)
     secret = db.Column(db.String(64), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -34,9 +54,11 @@ class Switch(db.Model):
     
     vlans = db.relationship('Vlan', backref='switch', lazy='dynamic', cascade='all, delete-orphan')
     mac_mappings = db.relationship('MacVlanMapping', backref='switch', lazy='dynamic', cascade='all, delete-orphan')
+    nas = db.relationship('NasClient', backref='switch', uselist=False, cascade='all, delete-orphan')
 
 class Vlan(db.Model):
     __tablename__ = 'vlans'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     switch_id = db.Column(db.Integer, db.ForeignKey('switches.id'), nullable=False)
     vlan_id = db.Column(db.Integer, nullable=False)
@@ -51,6 +73,7 @@ class Vlan(db.Model):
 
 class MacVlanMapping(db.Model):
     __tablename__ = 'mac_vlan_mapping'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     mac_address = db.Column(db.String(17), nullable=False)
     vlan_id = db.Column(db.Integer, db.ForeignKey('vlans.id'), nullable=False)
@@ -64,6 +87,7 @@ class MacVlanMapping(db.Model):
 # FreeRADIUS model classes
 class RadCheck(db.Model):
     __tablename__ = 'radcheck'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False)
     attribute = db.Column(db.String(64), nullable=False)
@@ -72,6 +96,7 @@ class RadCheck(db.Model):
 
 class RadReply(db.Model):
     __tablename__ = 'radreply'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False)
     attribute = db.Column(db.String(64), nullable=False)
@@ -80,6 +105,7 @@ class RadReply(db.Model):
 
 class RadUserGroup(db.Model):
     __tablename__ = 'radusergroup'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False)
     groupname = db.Column(db.String(64), nullable=False)
@@ -87,6 +113,7 @@ class RadUserGroup(db.Model):
 
 class NasClient(db.Model):
     __tablename__ = 'nas'
+    __site_scoped__ = True
     id = db.Column(db.Integer, primary_key=True)
     nasname = db.Column(db.String(128), nullable=False)
     shortname = db.Column(db.String(32), nullable=True)
@@ -96,3 +123,5 @@ class NasClient(db.Model):
     server = db.Column(db.String(64))
     community = db.Column(db.String(50))
     description = db.Column(db.String(200))
+    # Stable link back to the managed switch; FreeRADIUS ignores extra columns
+    switch_id = db.Column(db.Integer, db.ForeignKey('switches.id', ondelete='CASCADE'), unique=True, nullable=True)
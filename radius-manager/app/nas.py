@@ -0,0 +1,125 @@
+# NAS registry: keeps FreeRADIUS `nas` rows in sync with switches and renders clients.conf
+import os
+import tempfile
+from collections import namedtuple
+
+import click
+
+from app import db
+from app.models import Switch, NasClient
+from app.sites import DEFAULT_SITE, current_site, set_current_site
+
+NasEntry = namedtuple('NasEntry', ['switch_id', 'nasname', 'shortname', 'type', 'secret', 'description'])
+
+
+class NasRegistry:
+    """Keeps the FreeRADIUS `nas` table in step with switches, keyed by Switch.id."""
+
+    def sync(self, switch):
+        """Create or update the NAS row for a switch. The caller commits."""
+        nas = switch.nas
+        if nas is None and switch.id is not None:
+            nas = NasClient.query.filter_by(switch_id=switch.id).first()
+        if nas is None:
+            # Adopt a legacy row created before NAS rows carried switch_id
+            nas = NasClient.query.filter_by(nasname=switch.ip_address, switch_id=None).first()
+        if nas is None:
+            nas = NasClient(type='cisco')
+            db.session.add(nas)
+        nas.switch = switch
+        nas.nasname = switch.ip_address
+        nas.shortname = switch.name
+        nas.secret = switch.secret
+        nas.description = switch.description
+        return nas
+
+    def sync_all(self, switches=None):
+        """Bring the NAS table in line with every switch using a single read of each table."""
+        if switches is None:
+            switches = Switch.query.all()
+        existing = {nas.switch_id: nas for nas in NasClient.query.filter(NasClient.switch_id.isnot(None))}
+        legacy = {nas.nasname: nas for nas in NasClient.query.filter(NasClient.switch_id.is_(None))}
+        for switch in switches:
+            nas = existing.get(switch.id) or legacy.pop(switch.ip_address, None)
+            if nas is None:
+                nas = NasClient(type='cisco')
+                db.session.add(nas)
+            nas.switch = switch
+            nas.nasname = switch.ip_address
+            nas.shortname = switch.name
+            nas.secret = switch.secret
+            nas.description = switch.description
+
+    def remove(self, switch):
+        """Delete the NAS row for a switch. The caller commits."""
+        nas = switch.nas or NasClient.query.filter_by(nasname=switch.ip_address, switch_id=None).first()
+        if nas is not None:
+            db.session.delete(nas)
+
+    def entries(self):
+        """Every managed NAS of the current site, read in one query."""
+        rows = db.session.query(
+            NasClient.switch_id, NasClient.nasname, NasClient.shortname,
+            NasClient.type, NasClient.secret, NasClient.description
+        ).filter(NasClient.switch_id.isnot(None)).order_by(NasClient.switch_id).all()
+        return [NasEntry(*row) for row in rows]
+
+    def render_clients_conf(self, entries=None):
+        """Render every managed NAS of the current site as FreeRADIUS client stanzas."""
+        # Switch ids are only unique within a site, so the site is part of the stanza name
+        site = current_site()
+        lines = []
+        for entry in self.entries() if entries is None else entries:
+            lines.append(f'client {site}-switch{entry.switch_id} {{')
+            lines.append(f'    ipaddr = {entry.nasname}')
+            lines.append(f'    secret = {_quote(entry.secret)}')
+            if entry.shortname:
+                lines.append(f'    shortname = {_quote(entry.shortname)}')
+            lines.append(f'    nas_type = {entry.type or "other"}')
+            lines.append('}')
+            lines.append('')
+        return '\n'.join(lines)
+
+    def write_clients_conf(self, path, entries=None):
+        """Atomically write clients.conf. Returns False when the file is already current."""
+        content = self.render_clients_conf(entries)
+        try:
+            with open(path) as f:
+                if f.read() == content:
+                    return False
+        except FileNotFoundError:
+            pass
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.clients.conf.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o640)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+
+    def init_app(self, app):
+        @app.cli.command('export-clients')
+        @click.option('--site', type=click.Choice([DEFAULT_SITE] + sorted(app.config['SITE_DATABASES'])),
+                      default=DEFAULT_SITE, show_default=True, help='Site whose switches to export.')
+        def export_clients(site):
+            """Regenerate the FreeRADIUS clients file for one site from its switch table."""
+            set_current_site(site)
+            self.sync_all()
+            db.session.commit()
+            path = app.config['RADIUS_CLIENTS_CONF'].format(site=site)
+            entries = self.entries()
+            if self.write_clients_conf(path, entries):
+                # FreeRADIUS 3 only re-reads its clients on a full restart, not on HUP
+                print(f"Wrote {len(entries)} NAS clients to {path}; run 'systemctl restart freeradius' to load them")
+            else:
+                print(f"{path} is already up to date")
+
+
+def _quote(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+nas_registry = NasRegistry()
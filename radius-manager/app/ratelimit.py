@@ -0,0 +1,128 @@
+# Sliding-window rate limiter for auth endpoints, in-process by default or shared via Redis
+import threading
+import time
+import uuid
+from collections import deque
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for a shared backend
+    redis = None
+
+
+class MemoryBackend:
+    """Per-process store of attempt timestamps keyed by an arbitrary string."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._swept = 0.0
+
+    def _live(self, key, window, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return deque()
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+        return hits
+
+    def _sweep(self, window, now):
+        """Forget keys whose newest attempt has left the window, at most once per window.
+
+        Keys seen once and never again (random usernames from a stuffing run)
+        are otherwise never looked up, so nothing else would drop them.
+        """
+        if now - self._swept < window:
+            return
+        self._swept = now
+        for key in [key for key, hits in self._hits.items() if hits[-1] <= now - window]:
+            del self._hits[key]
+
+    def acquire(self, keys, limit, window, now):
+        """Record an attempt against every key unless one of them is already at the limit."""
+        with self._lock:
+            self._sweep(window, now)
+            windows = [self._live(key, window, now) for key in keys]
+            if any(len(hits) >= limit for hits in windows):
+                return False
+            for key, hits in zip(keys, windows):
+                hits.append(now)
+                self._hits[key] = hits
+            return True
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class RedisBackend:
+    """Shared store so several workers enforce the same limits."""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('RATELIMIT_STORAGE_URL is set but the redis package is not installed')
+        self._redis = redis.Redis.from_url(url)
+
+    def acquire(self, keys, limit, window, now):
+        member = f'{now!r}:{uuid.uuid4().hex}'
+        # MULTI/EXEC: the attempt is added and counted in one step, so parallel
+        # requests each see the others' reservations
+        pipe = self._redis.pipeline(transaction=True)
+        for key in keys:
+            pipe.zremrangebyscore(key, 0, now - window)
+            pipe.zadd(key, {member: now})
+            pipe.zcard(key)
+            pipe.expire(key, int(window) + 1)
+        counts = pipe.execute()[2::4]
+        if any(count > limit for count in counts):
+            pipe = self._redis.pipeline(transaction=True)
+            for key in keys:
+                pipe.zrem(key, member)
+            pipe.execute()
+            return False
+        return True
+
+    def reset(self, key):
+        self._redis.delete(key)
+
+
+class RateLimiter:
+    """Allow at most `limit` hits per key inside a sliding `window` of seconds."""
+
+    def __init__(self, limit=5, window=60, backend=None, prefix='ratelimit'):
+        self.limit = limit
+        self.window = window
+        self.backend = backend or MemoryBackend()
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def acquire(self, *keys):
+        """Reserve an attempt for every key. Returns False, recording nothing, when any key is over its limit.
+
+        The reservation happens before the caller does any expensive work, so a
+        parallel burst cannot slip past the limit while earlier attempts are
+        still being checked.
+        """
+        return self.backend.acquire([self._key(k) for k in keys if k], self.limit, self.window, time.time())
+
+    def reset(self, *keys):
+        for k in keys:
+            if k:
+                self.backend.reset(self._key(k))
+
+    def init_app(self, app, prefix):
+        self.prefix = f'vlanager:{prefix}'
+        self.limit = app.config[f'{prefix.upper()}_RATE_LIMIT']
+        self.window = app.config[f'{prefix.upper()}_RATE_WINDOW']
+        url = app.config.get('RATELIMIT_STORAGE_URL')
+        if url:
+            self.backend = RedisBackend(url)
+
+
+login_limiter = RateLimiter()
+login_ip_limiter = RateLimiter(limit=20)
+register_limiter = RateLimiter()
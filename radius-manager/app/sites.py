@@ -0,0 +1,130 @@
+# Site-aware routing: switch, VLAN, MAC and RADIUS rows live in the database of the switch's site
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session as _FlaskSession
+from sqlalchemy.orm import Session as _OrmSession
+
+DEFAULT_SITE = 'default'
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def site_names():
+    """Configured sites, with the default site (the main database) first."""
+    return [DEFAULT_SITE] + sorted(s for s in current_app.config['SITE_DATABASES'] if s != DEFAULT_SITE)
+
+
+def current_site():
+    if has_app_context():
+        return g.get('site', DEFAULT_SITE)
+    return DEFAULT_SITE
+
+
+def set_current_site(site):
+    if site not in site_names():
+        raise KeyError(site)
+    g.site = site
+
+
+def site_engine(site):
+    """Engine for a site. The default site shares Flask-SQLAlchemy's engine."""
+    if site == DEFAULT_SITE:
+        return current_app.extensions['sqlalchemy'].engine
+    uri = current_app.config['SITE_DATABASES'][site]
+    with _engines_lock:
+        engine = _engines.get(uri)
+        if engine is None:
+            timeout = current_app.config['SITE_TIMEOUT']
+            engine = _engines[uri] = sa.create_engine(
+                uri, pool_pre_ping=True, pool_timeout=timeout, connect_args=_connect_args(uri, timeout))
+        return engine
+
+
+def _connect_args(uri, timeout):
+    """Driver options that stop an unreachable site database from hanging a request."""
+    backend = sa.engine.make_url(uri).get_backend_name()
+    if backend == 'mysql':
+        return {'connect_timeout': timeout, 'read_timeout': timeout, 'write_timeout': timeout}
+    if backend == 'postgresql':
+        return {'connect_timeout': timeout}
+    if backend == 'sqlite':
+        return {'timeout': timeout}
+    return {}
+
+
+def _is_site_scoped(mapper):
+    return mapper is not None and getattr(sa.inspect(mapper).class_, '__site_scoped__', False)
+
+
+class SiteSession(_FlaskSession):
+    """db.session that sends site-scoped models to the current request's site engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _is_site_scoped(mapper):
+            site = current_site()
+            if site != DEFAULT_SITE:
+                return site_engine(site)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def fan_out(fn, sites=None):
+    """Run fn(site, session) against every site in parallel.
+
+    Returns ([(site, result), ...], {site: error}). A site that raises or
+    does not answer within SITE_TIMEOUT seconds is reported in the errors
+    dict instead of failing the whole call. Each call gets its own
+    short-lived ORM session; objects it returns are detached, so fn must
+    load whatever the caller will read.
+    """
+    sites = sites or site_names()
+    engines = {site: site_engine(site) for site in sites}
+    timeout = current_app.config['SITE_TIMEOUT']
+    logger = current_app.logger
+
+    def run(site):
+        with _OrmSession(engines[site], expire_on_commit=False) as session:
+            return fn(site, session)
+
+    results, errors = [], {}
+    if len(sites) == 1:
+        try:
+            results.append((sites[0], run(sites[0])))
+        except Exception as e:
+            errors[sites[0]] = str(e)
+    else:
+        pool = ThreadPoolExecutor(max_workers=min(len(sites), current_app.config['SITE_FANOUT_WORKERS']))
+        futures = {site: pool.submit(run, site) for site in sites}
+        wait(futures.values(), timeout=timeout)
+        # Do not block the request on a site that is still hanging
+        pool.shutdown(wait=False, cancel_futures=True)
+        for site, future in futures.items():
+            if not future.done():
+                errors[site] = f'no answer within {timeout}s'
+            elif future.exception() is not None:
+                errors[site] = str(future.exception())
+            else:
+                results.append((site, future.result()))
+    for site, error in errors.items():
+        logger.warning('Site %s unavailable: %s', site, error)
+    return results, errors
+
+
+def site_scoped_tables(db):
+    return [m.local_table for m in db.Model.registry.mappers if getattr(m.class_, '__site_scoped__', False)]
+
+
+def init_app(app, db):
+    @app.cli.command('init-sites')
+    def init_sites():
+        """Create the switch/VLAN/RADIUS tables in every configured site database.
+
+        Only missing tables are created; upgrade existing ones with the scripts in sql/.
+        """
+        tables = site_scoped_tables(db)
+        for site in site_names():
+            db.metadata.create_all(site_engine(site), tables=tables)
+            print(f"Initialised site {site}")
@@ -0,0 +1,8 @@
+-- Upgrade for existing installs: link FreeRADIUS nas rows to the switch they describe.
+-- Run once against the radius database:  mysql -u radius -p radius < sql/001_nas_switch_id.sql
+-- Existing rows keep switch_id NULL and are adopted by nasname on the next edit
+-- or `flask export-clients`.
+ALTER TABLE nas
+    ADD COLUMN switch_id INT NULL,
+    ADD UNIQUE KEY uq_nas_switch_id (switch_id),
+    ADD CONSTRAINT fk_nas_switch_id FOREIGN KEY (switch_id) REFERENCES switches(id) ON DELETE CASCADE;
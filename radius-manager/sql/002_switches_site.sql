@@ -0,0 +1,6 @@
+-- Upgrade for existing installs: record which site each switch belongs to.
+-- Run once against every site database:  mysql -u radius -p radius < sql/002_switches_site.sql
+-- `flask init-sites` only creates missing tables; it never adds this column to an existing one.
+ALTER TABLE switches
+    ADD COLUMN site VARCHAR(32) NOT NULL DEFAULT 'default' AFTER ip_address,
+    ADD INDEX ix_switches_site (site);
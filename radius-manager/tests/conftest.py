@@ -0,0 +1,56 @@
+# Test fixtures: the app runs against temporary SQLite files, one per site
+import json
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix='vlanager-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{_tmp}/main.db'
+os.environ['SITE_DATABASES'] = json.dumps({'east': f'sqlite:///{_tmp}/east.db'})
+os.environ['CREATE_DEFAULT_ADMIN'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['PROXY_FIX_HOPS'] = '1'
+
+import pytest
+
+from app import app as flask_app, db
+from app.models import User
+from app.ratelimit import MemoryBackend, login_ip_limiter, login_limiter, register_limiter
+from app.sites import DEFAULT_SITE, site_engine, site_names, site_scoped_tables
+
+
+def _site_engines():
+    return [site_engine(site) for site in site_names() if site != DEFAULT_SITE]
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.create_all()
+        for engine in _site_engines():
+            db.metadata.create_all(engine, tables=site_scoped_tables(db))
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        admin.set_password('adminpassword')
+        db.session.add(admin)
+        db.session.commit()
+    login_limiter.backend = MemoryBackend()
+    login_ip_limiter.backend = MemoryBackend()
+    register_limiter.backend = MemoryBackend()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        for engine in _site_engines():
+            db.metadata.drop_all(engine, tables=site_scoped_tables(db))
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+    return client
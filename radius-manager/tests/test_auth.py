@@ -0,0 +1,97 @@
+import threading
+
+from werkzeug.security import generate_password_hash
+
+from app.models import User, normalise_hash_method
+from app.ratelimit import MemoryBackend, RateLimiter
+
+
+def _login(client, username, password, ip='10.0.0.1'):
+    return client.post('/login', data={'username': username, 'password': password},
+                       headers={'X-Forwarded-For': ip})
+
+
+def test_failed_logins_are_throttled_before_the_password_check(client, monkeypatch):
+    checks = []
+    original = User.check_password
+    monkeypatch.setattr(User, 'check_password', lambda self, pw: checks.append(pw) or original(self, pw))
+
+    for _ in range(5):
+        assert _login(client, 'admin', 'wrong').status_code == 302
+    assert _login(client, 'admin', 'wrong').status_code == 429
+    assert _login(client, 'admin', 'adminpassword').status_code == 429
+    assert len(checks) == 5
+
+
+def test_rate_limit_keys_on_the_forwarded_client_address(app, client):
+    for i in range(app.config['LOGIN_IP_RATE_LIMIT']):
+        _login(client, f'nobody{i}', 'wrong', ip='10.0.0.1')
+    assert _login(client, 'someone', 'wrong', ip='10.0.0.1').status_code == 429
+
+    response = _login(client, 'admin', 'adminpassword', ip='10.0.0.2')
+    assert response.status_code == 302
+    assert '/login' not in response.headers['Location']
+
+
+def test_failures_from_other_addresses_do_not_lock_an_account_out(client):
+    for i in range(3):
+        for _ in range(5):
+            _login(client, 'admin', 'wrong', ip=f'10.0.1.{i}')
+        assert _login(client, 'admin', 'wrong', ip=f'10.0.1.{i}').status_code == 429
+
+    response = _login(client, 'admin', 'adminpassword', ip='10.0.0.2')
+    assert response.status_code == 302
+    assert '/login' not in response.headers['Location']
+
+
+def test_registration_is_throttled_per_ip(client):
+    for i in range(3):
+        client.post('/register', data={'username': f'u{i}'}, headers={'X-Forwarded-For': '10.0.0.3'})
+    response = client.post('/register', data={'username': 'u9'}, headers={'X-Forwarded-For': '10.0.0.3'})
+    assert response.status_code == 429
+
+
+def test_acquire_admits_exactly_the_limit_under_a_parallel_burst():
+    limiter = RateLimiter(limit=5, window=60)
+    admitted = []
+    threads = [threading.Thread(target=lambda: admitted.append(limiter.acquire('ip:x', 'user:y')))
+               for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(admitted) == 5
+    # A rejected attempt records nothing against its other keys
+    assert limiter.acquire('ip:other', 'user:z')
+
+
+def test_reset_clears_only_the_given_key():
+    limiter = RateLimiter(limit=1, window=60)
+    assert limiter.acquire('ip:a', 'user:b')
+    limiter.reset('user:b')
+    assert not limiter.acquire('ip:a', 'user:b')
+    assert limiter.acquire('ip:c', 'user:b')
+
+
+def test_memory_backend_forgets_expired_keys():
+    backend = MemoryBackend()
+    for i in range(20000):
+        backend.acquire([f'ip:{i}', f'user:{i}'], 5, 10, now=i * 0.01)
+    # Only keys touched in roughly the last two windows survive
+    assert len(backend._hits) <= 2 * 2 * 10 / 0.01 + 2
+    assert backend.acquire(['ip:0'], 1, 10, now=1000)
+    backend.acquire(['ip:0'], 1, 10, now=2000)
+    assert list(backend._hits) == ['ip:0']
+
+
+def test_shorthand_hash_methods_match_what_werkzeug_writes():
+    for method in ('pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha512:1000', 'scrypt', 'scrypt:16384:8:1'):
+        assert generate_password_hash('x', method=method).split('$')[0] == normalise_hash_method(method)
+
+
+def test_needs_rehash_only_for_other_methods(app):
+    with app.app_context():
+        user = User.query.filter_by(username='admin').first()
+        assert not user.needs_rehash()
+        user.password_hash = generate_password_hash('adminpassword', method='pbkdf2:sha256:2000')
+        assert user.needs_rehash()
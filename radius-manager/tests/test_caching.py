@@ -0,0 +1,60 @@
+from flask import Flask, url_for
+
+from app import assets
+
+
+def _drop_flashes(client):
+    # main/* pages never render flashes, so clear them to compare ETags on row changes alone
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+
+
+def test_page_etag_changes_after_a_delete(admin_client):
+    admin_client.post('/switch/add', data={'site': 'default', 'name': 'core', 'ip_address': '10.0.0.1', 'secret': 's'})
+    admin_client.post('/switch/1/vlan/add', data={'vlan_id': 10, 'name': 'users'})
+    admin_client.post('/switch/1/vlan/add', data={'vlan_id': 20, 'name': 'voice'})
+    _drop_flashes(admin_client)
+    first = admin_client.get('/switch/1/vlans')
+    etag = first.headers['ETag']
+
+    assert admin_client.get('/switch/1/vlans', headers={'If-None-Match': etag}).status_code == 304
+
+    admin_client.post('/vlan/2/delete')
+    _drop_flashes(admin_client)
+    after = admin_client.get('/switch/1/vlans', headers={'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+
+
+def test_if_modified_since_alone_never_yields_304(admin_client):
+    admin_client.post('/switch/add', data={'site': 'default', 'name': 'core', 'ip_address': '10.0.0.1', 'secret': 's'})
+    _drop_flashes(admin_client)
+    response = admin_client.get('/switch/1/vlans')
+    assert response.headers['Last-Modified']
+    assert admin_client.get('/switch/1/vlans', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 200
+
+
+def test_rebuild_keeps_old_assets_until_pruned(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'css' / 'style.css').write_text('body {}')
+    app = Flask(__name__, static_folder=str(static))
+    assets.init_app(app)
+    app.add_url_rule('/', 'css', lambda: url_for('static', filename='css/style.css'))
+    client = app.test_client()
+
+    assets.build(app.static_folder)
+    old = client.get('/').text
+    (static / 'css' / 'style.css').write_text('body { color: red }')
+    assets.build(app.static_folder)
+    new = client.get('/').text
+
+    assert old != new
+    assert client.get(old).status_code == 200
+    response = client.get(new, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+
+    assert assets.prune(app.static_folder, 3600) == 0
+    assert assets.prune(app.static_folder, 0) == 1
+    assert client.get(old).status_code == 404
@@ -0,0 +1,52 @@
+from app import db
+from app.models import NasClient
+from app.sites import set_current_site
+
+
+def _add_switch(client, site, name, ip, secret='s3cret'):
+    return client.post('/switch/add', data={'site': site, 'name': name, 'ip_address': ip, 'secret': secret})
+
+
+def _rows(app, site, model):
+    with app.test_request_context():
+        set_current_site(site)
+        return db.session.query(model).all()
+
+
+def test_editing_a_switch_ip_updates_its_nas_row(app, admin_client):
+    _add_switch(admin_client, 'east', 'edge', '10.9.0.1', secret='old')
+    admin_client.post('/switch/1/edit?site=east', data={'name': 'edge', 'ip_address': '10.9.0.2', 'secret': 'new'})
+
+    [nas] = _rows(app, 'east', NasClient)
+    assert (nas.switch_id, nas.nasname, nas.secret) == (1, '10.9.0.2', 'new')
+    assert _rows(app, 'default', NasClient) == []
+
+
+def test_legacy_nas_row_is_adopted_and_removed_with_its_switch(app, admin_client):
+    with app.app_context():
+        db.session.add(NasClient(nasname='10.0.0.1', secret='legacy', type='cisco'))
+        db.session.commit()
+    _add_switch(admin_client, 'default', 'core', '10.0.0.1', secret='fresh')
+
+    [nas] = _rows(app, 'default', NasClient)
+    assert (nas.switch_id, nas.secret) == (1, 'fresh')
+
+    admin_client.post('/switch/1/delete')
+    assert _rows(app, 'default', NasClient) == []
+
+
+def test_export_clients_names_stanzas_by_site(app, admin_client, tmp_path):
+    _add_switch(admin_client, 'east', 'edge', '10.9.0.1')
+    app.config['RADIUS_CLIENTS_CONF'] = str(tmp_path / 'vlanager-{site}.conf')
+
+    result = app.test_cli_runner().invoke(args=['export-clients', '--site', 'east'])
+    assert result.exit_code == 0, result.output
+    content = (tmp_path / 'vlanager-east.conf').read_text()
+    assert 'client east-switch1 {' in content
+    assert 'ipaddr = 10.9.0.1' in content
+
+
+def test_export_clients_rejects_unknown_site(app):
+    result = app.test_cli_runner().invoke(args=['export-clients', '--site', 'nope'])
+    assert result.exit_code == 2
+    assert "Invalid value for '--site'" in result.output
@@ -0,0 +1,73 @@
+from app import db
+from app.models import Switch, Vlan
+from app.sites import set_current_site, site_scoped_tables
+
+
+def _add_switch(client, site, name, ip, secret='s3cret'):
+    return client.post('/switch/add', data={'site': site, 'name': name, 'ip_address': ip, 'secret': secret})
+
+
+def _rows(app, site, model):
+    with app.test_request_context():
+        set_current_site(site)
+        return db.session.query(model).all()
+
+
+def test_switches_with_colliding_ids_stay_in_their_own_site(app, admin_client):
+    assert _add_switch(admin_client, 'default', 'core', '10.0.0.1').status_code == 302
+    assert _add_switch(admin_client, 'east', 'edge', '10.9.0.1').status_code == 302
+    admin_client.post('/switch/1/vlan/add?site=east', data={'vlan_id': 10, 'name': 'east-users'})
+
+    [default_switch] = _rows(app, 'default', Switch)
+    [east_switch] = _rows(app, 'east', Switch)
+    assert default_switch.id == east_switch.id == 1
+    assert (default_switch.site, east_switch.site) == ('default', 'east')
+    assert _rows(app, 'default', Vlan) == []
+    assert [v.name for v in _rows(app, 'east', Vlan)] == ['east-users']
+
+    assert 'east-users' in admin_client.get('/switch/1/vlans?site=east').text
+    assert 'east-users' not in admin_client.get('/switch/1/vlans').text
+
+
+def test_unknown_site_is_not_found(admin_client):
+    assert admin_client.get('/switch/1/vlans?site=west').status_code == 404
+
+
+def test_api_merges_every_site(admin_client):
+    _add_switch(admin_client, 'default', 'core', '10.0.0.1')
+    _add_switch(admin_client, 'east', 'edge', '10.9.0.1')
+
+    response = admin_client.get('/api/switches')
+    assert [(s['site'], s['id'], s['name']) for s in response.json] == [('default', 1, 'core'), ('east', 1, 'edge')]
+    assert 'X-Unavailable-Sites' not in response.headers
+
+
+def test_api_returns_partial_results_when_a_site_is_down(app, admin_client, monkeypatch):
+    _add_switch(admin_client, 'east', 'edge', '10.9.0.1')
+    sites = dict(app.config['SITE_DATABASES'], west='sqlite:////nonexistent-dir/west.db')
+    monkeypatch.setitem(app.config, 'SITE_DATABASES', sites)
+
+    response = admin_client.get('/api/switches')
+    assert response.status_code == 200
+    assert [s['name'] for s in response.json] == ['edge']
+    assert response.headers['X-Unavailable-Sites'] == 'west'
+
+
+def test_links_use_the_database_a_switch_was_read_from(app, admin_client, monkeypatch):
+    # sql/002 back-fills switches.site with 'default' on every existing database
+    with app.test_request_context():
+        set_current_site('east')
+        db.session.add(Switch(name='legacy', ip_address='10.9.0.9', secret='s', site='default'))
+        db.session.commit()
+    monkeypatch.setattr('app.main.routes.is_switch_online_snmp', lambda ip: True)
+
+    assert [(s['site'], s['name']) for s in admin_client.get('/api/switches').json] == [('east', 'legacy')]
+    page = admin_client.get('/switches').text
+    assert '/switch/1/edit?site=east' in page
+    assert '/switch/1/vlans?site=east' in page
+
+
+def test_every_freeradius_table_is_created_in_site_databases(app):
+    with app.app_context():
+        tables = {t.name for t in site_scoped_tables(db)}
+    assert {'radcheck', 'radreply', 'radusergroup', 'nas'} <= tables
@@ -61,10 +61,12 @@ CREATE TABLE IF NOT EXISTS switches (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(64) NOT NULL,
     ip_address VARCHAR(15) NOT NULL UNIQUE,
+    site VARCHAR(32) NOT NULL DEFAULT 'default',
     secret VARCHAR(64) NOT NULL,
     description TEXT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX ix_switches_site (site)
 );
 ;
 CREATE TABLE IF NOT EXISTS vlans (
@@ -133,7 +135,9 @@ CREATE TABLE IF NOT EXISTS nas (
     secret VARCHAR(60) NOT NULL,
     server VARCHAR(64),
     community VARCHAR(50),
-    description VARCHAR(200)
+    description VARCHAR(200),
+    switch_id INT NULL UNIQUE,
+    FOREIGN KEY (switch_id) REFERENCES switches(id) ON DELETE CASCADE
 );
 FLUSH PRIVILEGES;
 EOF
@@ -156,7 +160,8 @@ sudo sed -i 's/#\s*port = 3306/port = 3306/' /etc/freeradius/3.0/mods-enabled/sq
 sudo sed -i 's/#\s*login = "radius"/login = "radius"/' /etc/freeradius/3.0/mods-enabled/sql
 sudo sed -i 's/#\s*password = "radpass"/password = "radpass"/' /etc/freeradius/3.0/mods-enabled/sql
 sudo sed -i 's/radius_db = "radius"/radius_db = "radius"/' /etc/freeradius/3.0/mods-enabled/sql
-sudo sed -i 's/read_clients = no/read_clients = yes/' /etc/freeradius/3.0/mods-enabled/sql
+# Switch clients come from clients.d/ (see `flask export-clients`), so the SQL nas table is not read as well
+sudo sed -i 's/read_clients = yes/read_clients = no/' /etc/freeradius/3.0/mods-enabled/sql
 
 echo "=== Enabling and Configuring sqlippool (if available) ==="
 if [ -f /etc/freeradius/3.0/mods-available/sqlippool ]; then
@@ -186,6 +191,9 @@ client localhost {
     require_message_authenticator = no
     nas_type = other
 }
+
+# One file per site, regenerated by \`flask export-clients\`
+\$INCLUDE clients.d/
 EOF
 
 echo "=== Disabling unnecessary modules in FreeRADIUS ==="
@@ -194,6 +202,8 @@ sudo rm -f /etc/freeradius/3.0/mods-enabled/policy
 echo "=== Setting proper ownership and permissions for FreeRADIUS ==="
 sudo chown -R freerad:freerad /etc/freeradius/3.0/
 sudo chmod -R 755 /etc/freeradius/3.0/
+# `flask export-clients` writes one file per site here, owned by the user running the web app
+sudo install -d -o "$(whoami)" -g freerad -m 2750 /etc/freeradius/3.0/clients.d
 
 
 echo "=== Installing phpMyAdmin with automated setup for Nginx ==="
@@ -131,11 +131,13 @@ CREATE TABLE IF NOT EXISTS switches (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(64) NOT NULL,
     ip_address VARCHAR(15) NOT NULL,
+    site VARCHAR(32) NOT NULL DEFAULT 'default',
     secret VARCHAR(64) NOT NULL,
     description TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    UNIQUE KEY (ip_address)
+    UNIQUE KEY (ip_address),
+    INDEX ix_switches_site (site)
 );
 
 CREATE TABLE IF NOT EXISTS vlans (
@@ -179,6 +181,17 @@ JOIN
     vlans v ON m.vlan_id = v.id
 JOIN 
     switches s ON m.switch_id = s.id;
+
+-- Link FreeRADIUS nas rows to the switch they were generated from (see radius-manager/sql/001_nas_switch_id.sql).
+-- Only added when missing, so the script can be re-run like the CREATE TABLE IF NOT EXISTS above.
+SET @nas_switch_id = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'nas' AND COLUMN_NAME = 'switch_id') = 0,
+    'ALTER TABLE nas ADD COLUMN switch_id INT NULL, ADD UNIQUE KEY uq_nas_switch_id (switch_id), ADD CONSTRAINT fk_nas_switch_id FOREIGN KEY (switch_id) REFERENCES switches(id) ON DELETE CASCADE',
+    'DO 0');
+PREPARE nas_switch_id FROM @nas_switch_id;
+EXECUTE nas_switch_id;
+DEALLOCATE PREPARE nas_switch_id;
 EOF
 
 # Enable SQL module in FreeRADIUS
@@ -211,7 +224,7 @@ sql {
     groupreply_table = "radgroupreply"
     usergroup_table = "radusergroup"
     read_groups = yes
-    read_clients = yes
+    read_clients = no
     client_table = "nas"
     
     group_attribute = "SQL-Group"
@@ -228,7 +241,7 @@ sql {
         idle_timeout = 60
     }
     
-    read_clients = yes
+    read_clients = no
     client_table = "nas"
     
     accounting {
@@ -294,9 +307,11 @@ client localhost {
     nas_type = other
 }
 
-# SQL clients will be loaded from the nas table in the database
-\$INCLUDE \${modconfdir}/sql/main/naslist.conf
+# Switch clients: one file per site, regenerated by \`flask export-clients\`
+\$INCLUDE clients.d/
 EOF
+# `flask export-clients` writes one file per site here, owned by the user running the web app
+sudo install -d -o "$(whoami)" -g freerad -m 2750 /etc/freeradius/3.0/clients.d
 
 # Set ownership and permissions
 print_message "Setting correct permissions..."
@@ -560,6 +575,8 @@ After=network.target
 [Service]
 User=$(whoami)
 WorkingDirectory=$(pwd)
+# nginx is the single trusted proxy in front of gunicorn
+Environment=PROXY_FIX_HOPS=1
 ExecStart=$(pwd)/venv/bin/gunicorn -b 127.0.0.1:5000 app:app
 Restart=always
 
@@ -578,6 +595,8 @@ server {
         proxy_pass http://127.0.0.1:5000;
         proxy_set_header Host \$host;
         proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$remote_addr;
+        proxy_set_header X-Forwarded-Proto \$scheme;
     }
 }
 EOF
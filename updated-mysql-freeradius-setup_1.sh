@@ -37,11 +37,13 @@ CREATE TABLE IF NOT EXISTS switches (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(64) NOT NULL,
     ip_address VARCHAR(15) NOT NULL,
+    site VARCHAR(32) NOT NULL DEFAULT 'default',
     secret VARCHAR(64) NOT NULL,
     description TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    UNIQUE KEY (ip_address)
+    UNIQUE KEY (ip_address),
+    INDEX ix_switches_site (site)
 );
 CREATE TABLE IF NOT EXISTS vlans (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -66,6 +68,17 @@ CREATE TABLE IF NOT EXISTS mac_vlan_mapping (
     FOREIGN KEY (switch_id) REFERENCES switches(id) ON DELETE CASCADE,
     UNIQUE KEY (mac_address, switch_id)
 );
+
+-- Link FreeRADIUS nas rows to the switch they were generated from (see radius-manager/sql/001_nas_switch_id.sql).
+-- Only added when missing, so the script can be re-run like the CREATE TABLE IF NOT EXISTS above.
+SET @nas_switch_id = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'nas' AND COLUMN_NAME = 'switch_id') = 0,
+    'ALTER TABLE nas ADD COLUMN switch_id INT NULL, ADD UNIQUE KEY uq_nas_switch_id (switch_id), ADD CONSTRAINT fk_nas_switch_id FOREIGN KEY (switch_id) REFERENCES switches(id) ON DELETE CASCADE',
+    'DO 0');
+PREPARE nas_switch_id FROM @nas_switch_id;
+EXECUTE nas_switch_id;
+DEALLOCATE PREPARE nas_switch_id;
 EOF
 
 echo "=== Enabling the SQL module ==="
@@ -83,7 +96,8 @@ sudo sed -i 's/#\s*password = "radpass"/password = "radpass"/' /etc/freeradius/3
 sudo sed -i 's/radius_db = "radius"/radius_db = "radius"/' /etc/freeradius/3.0/mods-enabled/sql
 sudo sed -i 's/\${..generic_failure_query}/null/' /etc/freeradius/3.0/mods-enabled/sql
 sudo sed -i 's/\${..generic_success_query}/null/' /etc/freeradius/3.0/mods-enabled/sql
-sudo sed -i 's/read_clients = no/read_clients = yes/' /etc/freeradius/3.0/mods-enabled/sql
+# Switch clients come from clients.d/ (see `flask export-clients`), so the SQL nas table is not read as well
+sudo sed -i 's/read_clients = yes/read_clients = no/' /etc/freeradius/3.0/mods-enabled/sql
 
 echo "=== Updating sites-enabled/default to enable SQL in relevant sections ==="
 sudo sed -i '/^#[[:space:]]*sql/s/^#[[:space:]]*//g' /etc/freeradius/3.0/sites-enabled/default
@@ -105,6 +119,9 @@ client default {
     ipaddr = 0.0.0.0/0
     secret = testing123
 }
+
+# One file per site, regenerated by \`flask export-clients\`
+\$INCLUDE clients.d/
 EOF
 
 echo "=== Creating MAC-based VLAN assignment policy file ==="
@@ -139,6 +156,8 @@ fi
 echo "=== Setting proper ownership and permissions ==="
 sudo chown -R freerad:freerad /etc/freeradius/3.0/
 sudo chmod -R 755 /etc/freeradius/3.0/
+# `flask export-clients` writes one file per site here, owned by the user running the web app
+sudo install -d -o "$(whoami)" -g freerad -m 2750 /etc/freeradius/3.0/clients.d
 
 echo "=== Restarting FreeRADIUS service ==="
 sudo systemctl restart freeradius